@@ -2,7 +2,11 @@ import json
 import os
 import sqlite3
 import tempfile
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
 
 import pandas as pd
 
@@ -26,12 +30,30 @@ def _get_config(key: str, default: str = "") -> str:
 
 DATA_BACKEND = _get_config("DATA_BACKEND", "").lower()
 FIREBASE_PROJECT_ID = _get_config("FIREBASE_PROJECT_ID", "willmade-datahub")
+MAX_FETCH = int(_get_config("MAX_FETCH", "3000"))
+
+# Firestore caps a batch at 500 writes; stay below it and commit chunks in parallel.
+FS_BATCH_SIZE = 400
+FS_WRITE_WORKERS = 10
+# Reads are fetched in cursor-chained pages instead of one long stream.
+FS_PAGE_SIZE = 500
+FS_READ_TIMEOUT = 30.0
+CACHE_TTL = int(_get_config("CACHE_TTL", "60"))
+
+# Resolved once at import; the per-backend implementations are bound below.
+_USE_FS = DATA_BACKEND == "firestore"
 
 _firestore_client = None
+# Streamlit reruns in worker threads; every use of the shared SQLite connection goes through this.
+_conn_lock = threading.Lock()
 
 
-def _use_firestore() -> bool:
-    return DATA_BACKEND == "firestore"
+def _cache_data(func):
+    """st.cache_data(ttl=CACHE_TTL) when streamlit is available, otherwise no caching."""
+    if st is None:
+        func.clear = lambda: None
+        return func
+    return st.cache_data(ttl=CACHE_TTL, show_spinner=False)(func)
 
 
 def _parse_service_account(raw: Any) -> Dict[str, Any]:
@@ -94,109 +116,171 @@ def _get_firestore():
     return _firestore_client
 
 
+@lru_cache(maxsize=1)
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    """Open the SQLite connection once (PRAGMAs included) and reuse it; hold _conn_lock while using it."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
+    return conn
+
+
+def _insert_rows(conn, table: str, df: pd.DataFrame) -> None:
+    """Append df to table with one executemany inside a single transaction."""
+    cols = ", ".join(df.columns)
+    marks = ", ".join("?" * len(df.columns))
+    # NaN -> NULL, same as to_sql
+    rows = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    with conn:
+        conn.executemany(f"INSERT INTO {table} ({cols}) VALUES ({marks})", rows)
+
+
+def _to_records(df: pd.DataFrame, dict_=dict, zip_=zip) -> Iterator[Dict[str, Any]]:
+    # itertuples skips to_dict's per-scalar boxing; dict_/zip_ bound as locals
+    cols = df.columns.tolist()
+    for t in df.itertuples(index=False, name=None):
+        yield dict_(zip_(cols, t))
+
+
+def _commit_batches(
+    col_ref,
+    records: Iterable[Dict[str, Any]],
+    size: int = FS_BATCH_SIZE,
+    workers: int = FS_WRITE_WORKERS,
+) -> None:
+    """Write records as auto-id docs, `size` per batch, committing batches concurrently."""
+    client = _get_firestore()
+    from firebase_admin import firestore
+    from google.api_core import exceptions, retry
+
+    commit_retry = retry.Retry(
+        predicate=retry.if_exception_type(exceptions.Aborted, exceptions.ServiceUnavailable)
+    )
 
+    def _commit(chunk: List[Dict[str, Any]]) -> None:
+        batch = client.batch()
+        for row in chunk:
+            batch.set(col_ref.document(), row | {"created_at": firestore.SERVER_TIMESTAMP})
+        batch.commit(retry=commit_retry)
 
-def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
-    return df.to_dict(orient="records")
+    it = iter(records)
+    chunks = iter(lambda: list(islice(it, size)), [])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises the first failed commit
+        list(pool.map(_commit, chunks))
 
 
-def insert_excel_records(df: pd.DataFrame):
-    if _use_firestore():
-        client = _get_firestore()
-        from firebase_admin import firestore
-
-        batch = client.batch()
-        col_ref = client.collection("excel_master")
-        for row in _to_records(df):
-            doc = col_ref.document()
-            row["created_at"] = firestore.SERVER_TIMESTAMP
-            batch.set(doc, row)
-        batch.commit()
-        return
-
-    conn = get_conn()
-    df.to_sql("excel_master", conn, if_exists="append", index=False)
-    conn.close()
-
-
-def load_excel_records() -> pd.DataFrame:
-    if _use_firestore():
-        client = _get_firestore()
-        from firebase_admin import firestore
-
-        docs = (
-            client.collection("excel_master")
-            .order_by("created_at", direction=firestore.Query.DESCENDING)
-            .stream()
-        )
-        rows = [doc.to_dict() | {"id": doc.id} for doc in docs]
-        if not rows:
-            return pd.DataFrame(columns=["id", "user_id", "phone", "memo", "created_at"])
-        return pd.DataFrame(rows)
-
-    conn = get_conn()
-    df = pd.read_sql("SELECT * FROM excel_master ORDER BY id DESC", conn)
-    conn.close()
+def _docs_to_frame(docs) -> pd.DataFrame:
+    """Build the frame column-wise from one pass over the stream; id goes first."""
+    ids: List[str] = []
+    data: List[Dict[str, Any]] = []
+    for doc in docs:
+        ids.append(doc.id)
+        data.append(doc.to_dict())
+    if not ids:
+        return pd.DataFrame(columns=["id", "user_id", "phone", "memo", "created_at"])
+    df = pd.DataFrame.from_records(data)
+    df.insert(0, "id", ids)
     return df
 
 
-def save_matched(df: pd.DataFrame):
-    if _use_firestore():
-        client = _get_firestore()
-        from firebase_admin import firestore
+def _delete_collection(coll) -> None:
+    # ids only (select([])) and let BulkWriter batch/parallelize the deletes
+    bw = _get_firestore().bulk_writer()
+    for doc in coll.select([]).stream():
+        bw.delete(doc.reference)
+    bw.close()
 
-        batch = client.batch()
-        col_ref = client.collection("match_list")
-        for row in _to_records(df):
-            doc = col_ref.document()
-            row["created_at"] = firestore.SERVER_TIMESTAMP
-            batch.set(doc, row)
-        batch.commit()
-        return
-
-    conn = get_conn()
-    df.to_sql("match_list", conn, if_exists="append", index=False)
-    conn.close()
-
-
-def load_matched() -> pd.DataFrame:
-    if _use_firestore():
-        client = _get_firestore()
-        from firebase_admin import firestore
-
-        docs = (
-            client.collection("match_list")
-            .order_by("created_at", direction=firestore.Query.DESCENDING)
-            .stream()
+
+# Firestore collections and SQLite tables share names (excel_master / match_list).
+def _insert_fs(name: str, df: pd.DataFrame) -> None:
+    _commit_batches(_get_firestore().collection(name), _to_records(df))
+
+
+def _insert_sqlite(name: str, df: pd.DataFrame) -> None:
+    with _conn_lock:
+        _insert_rows(get_conn(), name, df)
+
+
+def _iter_pages(query, limit: int) -> Iterator[Any]:
+    """Yield up to `limit` docs of an ordered query, FS_PAGE_SIZE at a time via start_after."""
+    from google.api_core import exceptions, retry
+
+    page_retry = retry.Retry(
+        predicate=retry.if_exception_type(exceptions.ServiceUnavailable, exceptions.DeadlineExceeded)
+    )
+    fetched = 0
+    last = None
+    while fetched < limit:
+        size = min(FS_PAGE_SIZE, limit - fetched)
+        page = query.limit(size)
+        if last is not None:
+            page = page.start_after(last)
+        docs = list(page.stream(retry=page_retry, timeout=FS_READ_TIMEOUT))
+        yield from docs
+        fetched += len(docs)
+        if len(docs) < size:
+            return
+        last = docs[-1]
+
+
+def _load_fs(name: str, limit: int) -> pd.DataFrame:
+    client = _get_firestore()
+    from firebase_admin import firestore
+
+    query = client.collection(name).order_by("created_at", direction=firestore.Query.DESCENDING)
+    return _docs_to_frame(_iter_pages(query, limit))
+
+
+def _load_sqlite(name: str, limit: int) -> pd.DataFrame:
+    # id is the rowid alias, so this walks the table b-tree backwards and stops at limit
+    with _conn_lock:
+        return pd.read_sql(
+            f"SELECT * FROM {name} ORDER BY id DESC LIMIT ?", get_conn(), params=(limit,)
         )
-        rows = [doc.to_dict() | {"id": doc.id} for doc in docs]
-        if not rows:
-            return pd.DataFrame(columns=["id", "user_id", "phone", "memo", "created_at"])
-        return pd.DataFrame(rows)
-
-    conn = get_conn()
-    df = pd.read_sql("SELECT * FROM match_list ORDER BY id DESC", conn)
-    conn.close()
-    return df
 
 
-def _delete_collection(coll) -> None:
-    docs = coll.stream()
-    for doc in docs:
-        doc.reference.delete()
+def _clear_fs() -> None:
+    client = _get_firestore()
+    _delete_collection(client.collection("excel_master"))
+    _delete_collection(client.collection("match_list"))
+
+
+def _clear_sqlite() -> None:
+    with _conn_lock, get_conn() as conn:
+        conn.execute("DELETE FROM excel_master")
+        conn.execute("DELETE FROM match_list")
+
+
+if _USE_FS:
+    _insert, _load, _clear = _insert_fs, _load_fs, _clear_fs
+else:
+    _insert, _load, _clear = _insert_sqlite, _load_sqlite, _clear_sqlite
+
+
+def insert_excel_records(df: pd.DataFrame):
+    _insert("excel_master", df)
+    load_excel_records.clear()
+
+
+@_cache_data
+def load_excel_records(limit: int = MAX_FETCH) -> pd.DataFrame:
+    return _load("excel_master", limit)
+
+
+def save_matched(df: pd.DataFrame):
+    _insert("match_list", df)
+    load_matched.clear()
+
+
+@_cache_data
+def load_matched(limit: int = MAX_FETCH) -> pd.DataFrame:
+    return _load("match_list", limit)
 
 
 def clear_all():
-    if _use_firestore():
-        client = _get_firestore()
-        _delete_collection(client.collection("excel_master"))
-        _delete_collection(client.collection("match_list"))
-        return
-
-    conn = get_conn()
-    conn.execute("DELETE FROM excel_master")
-    conn.execute("DELETE FROM match_list")
-    conn.commit()
-    conn.close()
+    _clear()
+    load_excel_records.clear()
+    load_matched.clear()
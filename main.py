@@ -5,6 +5,7 @@ from processor import process_excel, process_best_list, match_lists
 from db import (
     DATA_BACKEND,
     FIREBASE_PROJECT_ID,
+    MAX_FETCH,
     clear_all,
     insert_excel_records,
     load_excel_records,
@@ -106,12 +107,12 @@ def main():
 
     with tab1:
         excel_all = load_excel_records()
-        st.caption(f"총 {len(excel_all)}건")
+        st.caption(f"표시 최대 {MAX_FETCH}행 (표시 중 {len(excel_all)}건)")
         st.dataframe(excel_all, use_container_width=True, height=350)
 
     with tab2:
         match_all = load_matched()
-        st.caption(f"총 {len(match_all)}건")
+        st.caption(f"표시 최대 {MAX_FETCH}행 (표시 중 {len(match_all)}건)")
         st.dataframe(match_all, use_container_width=True, height=350)
 
     st.markdown("---")
@@ -1,5 +1,9 @@
+from itertools import islice
+from typing import Iterator
+
 import pandas as pd
 import re
+from python_calamine import CalamineWorkbook
 
 # 한글/영문 숫자 → 숫자 변환 맵
 CHAR_MAP = {
@@ -13,8 +17,21 @@ CHAR_MAP = {
     'B': '8',
 }
 
+# 한 글자 → 한 글자 변환만 있으므로 str.translate 테이블로 미리 만들어 둠
+_DIGIT_TABLE = str.maketrans(CHAR_MAP)
+
+# 엑셀을 한 번에 이만큼씩만 읽어서 처리 (메모리 피크 제한)
+EXCEL_CHUNK_ROWS = 10_000
+
 phone_pattern = re.compile(r'0\d{1,2}[-\s\.\)]*\d{3,4}[-\s\.\)]*\d{4}')
 
+# 서울번호(02) 10자리 → 2-4-4 / 그 외 10자리 → 3-3-4 / 11자리 → 3-4-4
+_FMT = re.compile(r'^(02)(\d{4})(\d{4})$|^(\d{3})(\d{3,4})(\d{4})$')
+
+
+def _join_groups(m: re.Match) -> str:
+    return '-'.join(g for g in m.groups() if g)
+
 
 def _normalize_digits(text: str) -> str:
     if text is None:
@@ -22,7 +39,7 @@ def _normalize_digits(text: str) -> str:
     if not isinstance(text, str):
         text = str(text)
 
-    return "".join(CHAR_MAP.get(ch, ch) for ch in text)
+    return text.translate(_DIGIT_TABLE)
 
 
 def extract_phone(text: str) -> str | None:
@@ -42,15 +59,57 @@ def extract_phone(text: str) -> str | None:
     if len(digits) < 9:
         return None
 
-    # 서울번호(02) / 휴대폰(010~) 대충 맞춰서 포맷팅
-    if digits.startswith("02") and len(digits) == 10:
-        return f"{digits[:2]}-{digits[2:6]}-{digits[6:]}"
-    elif len(digits) == 10:
-        return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
-    elif len(digits) == 11:
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    else:
-        return digits  # 예외는 그냥 숫자만 반환
+    # 서울번호(02) / 휴대폰(010~) 대충 맞춰서 포맷팅, 예외는 그냥 숫자만 반환
+    return _FMT.sub(_join_groups, digits)
+
+
+def _extract_phones(text: pd.Series) -> pd.Series:
+    """
+    extract_phone 을 컬럼 단위로 한 번에 적용하는 버전
+    (행마다 파이썬 루프 돌지 않고 pandas str 연산으로 처리)
+    """
+    norm = text.str.translate(_DIGIT_TABLE)
+    digits = norm.str.extract(f"({phone_pattern.pattern})", expand=False)
+    digits = digits.str.replace(r'\D', '', regex=True)
+
+    phones = digits.str.replace(_FMT, _join_groups, regex=True)
+    return phones.where(digits.str.len() >= 9, None)
+
+
+def _cell_str(value) -> str | None:
+    """calamine 셀 값 → 문자열 (빈 칸은 None, 1012345678.0 같은 정수형 실수는 정수로)"""
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _iter_abd_chunks(excel_file, chunk_rows: int = EXCEL_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    calamine 으로 첫 번째 시트를 한 행씩 읽으면서 A / B / D 열만 chunk_rows 행씩 잘라서 반환
+    (첫 행은 헤더라 건너뜀, 컬럼 라벨은 0 / 1 / 3, 값은 문자열 또는 None)
+    """
+    sheet = CalamineWorkbook.from_filelike(excel_file).get_sheet_by_index(0)
+    # iter_rows 는 사용 영역의 첫 열부터 나오므로 A / B / D 위치를 그만큼 당겨서 찾음
+    ia, ib, id_ = (i - sheet.start[1] for i in (0, 1, 3))
+    rows = sheet.iter_rows()
+    next(rows, None)  # 헤더
+
+    cell_str = _cell_str  # 셀마다 도는 루프라 로컬로 묶어 둠
+    while True:
+        chunk = []
+        append = chunk.append
+        for row in islice(rows, chunk_rows):
+            n = len(row)
+            append((
+                cell_str(row[ia]) if 0 <= ia < n else None,
+                cell_str(row[ib]) if 0 <= ib < n else None,
+                cell_str(row[id_]) if 0 <= id_ < n else None,
+            ))
+        if not chunk:
+            break
+        yield pd.DataFrame(chunk, columns=[0, 1, 3], dtype=object)
 
 
 def process_excel(excel_file) -> pd.DataFrame:
@@ -61,27 +120,20 @@ def process_excel(excel_file) -> pd.DataFrame:
     - D열: 본문(전화번호 있을 수도 있음)
     만 사용해서 user_id, phone, memo 데이터프레임 생성
     """
-    df_raw = pd.read_excel(excel_file)
-
-    # A / B / D 컬럼 인덱스로 강제 가져오기 (헤더 이름 상관 없음)
-    col_a = df_raw.iloc[:, 0]  # 아이디
-    col_b = df_raw.iloc[:, 1] if df_raw.shape[1] > 1 else ""
-    col_d = df_raw.iloc[:, 3] if df_raw.shape[1] > 3 else ""
-
-    user_ids = col_a.astype(str).str.strip()
-
-    phones: list[str | None] = []
-    for b, d in zip(col_b, col_d):
-        combined_text = f"{b or ''} {d or ''}"
-        phones.append(extract_phone(combined_text))
-
-    result = pd.DataFrame(
-        {
-            "user_id": user_ids,
-            "phone": phones,
-            "memo": "",   # 메모는 UI에서 직접 입력 가능하게 남겨둠
-        }
-    )
+    parts = []
+    for chunk in _iter_abd_chunks(excel_file):
+        parts.append(
+            pd.DataFrame(
+                {
+                    "user_id": chunk[0],  # 아이디
+                    "phone": _extract_phones(chunk[1].fillna("") + " " + chunk[3].fillna("")),
+                    "memo": "",   # 메모는 UI에서 직접 입력 가능하게 남겨둠
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame(columns=["user_id", "phone", "memo"])
+    result = pd.concat(parts, ignore_index=True)
 
     # 아이디 없는 행 정리 & 중복 제거
     result = result[result["user_id"].notna()]
@@ -2,15 +2,28 @@ import json
 import os
 import re
 import tempfile
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
 import pandas as pd
 import streamlit as st
 
+@st.cache_data(max_entries=1)
+def load_parquet(path, mtime, size):
+    """mtime / size 를 캐시 키에 포함 → 파일이 바뀌면 자동으로 다시 읽음 (최신 1개만 보관)."""
+    return pd.read_parquet(path)
+
+
 @st.cache_data
-def load_excel(path):
-    import pandas as pd
-    return pd.read_excel(path)
+def load_upload(file):
+    """업로드 엑셀에서 A/B/D 열만 문자열로 읽기 (헤더 제외, 컬럼 라벨 0/1/3)."""
+    options = {"engine": "calamine", "dtype": str, "header": None, "skiprows": 1}
+    try:
+        return pd.read_excel(file, usecols=[0, 1, 3], **options)
+    except ValueError:  # D열까지 없는 시트
+        file.seek(0)
+        return pd.read_excel(file, **options)
 
 st.set_page_config(page_title="Willmade DataHub", layout="wide")
 st.markdown(
@@ -34,15 +47,24 @@ FIREBASE_PROJECT_ID = _get_config("FIREBASE_PROJECT_ID", "willmade-datahub")
 MAX_FETCH = int(_get_config("MAX_FETCH", "3000"))
 SAMPLE_ROWS = int(_get_config("SAMPLE_ROWS", "10"))
 DEFAULT_VIEW_LIMIT = MAX_FETCH  # 화면 표시 시 기본 행 수 제한
+CACHE_TTL = int(_get_config("CACHE_TTL", "60"))  # Firestore 조회 캐시 유지 시간(초)
+COMPACT_BYTES = int(_get_config("COMPACT_BYTES", str(8 << 20)))  # 로컬 저장소 중복 정리 최소 크기
 
 STORE_CAFE = "blog_store.txt"  # ID,PHONE
 STORE_BEST = "best_store.txt"  # BEST ID ONLY
-MATCH_XLSX = "match_result.xlsx"
+MATCH_PARQUET = "match_result.parquet"
+MATCH_XLSX = "match_result.xlsx"  # 예전 저장 형식 (있으면 parquet 로 한 번 옮김)
 
 COL_CAFE = "cafe_store"
 COL_BEST = "best_store"
 COL_MATCH = "match_results"
 
+# Firestore batch 한도(500) 아래로 잘라서 병렬 커밋
+FS_BATCH_SIZE = 400
+FS_WRITE_WORKERS = 10
+FS_PAGE_SIZE = 500  # 조회는 이 크기 페이지로 나눠서 (긴 스트림 하나 대신)
+FS_READ_TIMEOUT = 30.0
+
 _firestore_client = None
 
 
@@ -148,13 +170,19 @@ CHAR_MAP = {
     "둘": "2",
     "셋": "3",
     "넷": "4",
-    "다섯": "5",
-    "여섯": "6",
     "칠": "7",
     "팔": "8",
+}
+
+# 두 글자 이상은 글자 단위 변환이 안 되므로 translate 전에 통째로 치환
+WORD_MAP = {
+    "다섯": "5",
+    "여섯": "6",
     "아홉": "9",
 }
 
+_CHAR_TABLE = str.maketrans(CHAR_MAP)
+
 PHONE_PATTERN = re.compile(r"010[0-9]{8}")
 
 
@@ -163,7 +191,9 @@ def _normalize(text: Any) -> str:
         return ""
     if not isinstance(text, str):
         text = str(text)
-    return "".join(CHAR_MAP.get(ch, ch) for ch in text)
+    for word, digit in WORD_MAP.items():
+        text = text.replace(word, digit)
+    return text.translate(_CHAR_TABLE)
 
 
 def extract_phone_numbers(text: Any) -> List[str]:
@@ -173,58 +203,148 @@ def extract_phone_numbers(text: Any) -> List[str]:
     return list({f"{f[:3]}-{f[3:7]}-{f[7:]}" for f in found})
 
 
+def extract_phone_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    load_upload 결과(1행 제외)에서 A열 블로그ID + B/D열 전화번호를 한 번에 추출.
+    _normalize + extract_phone_numbers 를 행마다 부르지 않고 pandas str 연산으로 처리.
+    """
+    body = df.iloc[1:]
+    text = body[1].fillna("")
+    if 3 in body.columns:
+        text = text + " " + body[3].fillna("")
+
+    for word, digit in WORD_MAP.items():
+        text = text.str.replace(word, digit, regex=False)
+    digits = text.str.translate(_CHAR_TABLE).str.replace(r"[^0-9]", "", regex=True)
+    found = digits.str.findall(PHONE_PATTERN).explode().dropna()
+
+    blog_ids = body[0].fillna("").str.strip()
+    return pd.DataFrame(
+        {
+            "블로그ID": blog_ids.loc[found.index].to_numpy(),
+            "전화번호": found.str.replace(r"(\d{3})(\d{4})(\d{4})", r"\1-\2-\3", regex=True).to_numpy(),
+        },
+        columns=["블로그ID", "전화번호"],
+    )
+
+
 # ------------------------------------------------------------------
 # Storage helpers (Firestore / local fallback)
 # ------------------------------------------------------------------
-def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
-    return df.to_dict(orient="records")
+def _to_records(df: pd.DataFrame, dict_=dict, zip_=zip) -> Iterator[Dict[str, Any]]:
+    # itertuples skips to_dict's per-scalar boxing; dict_/zip_ bound as locals
+    cols = df.columns.tolist()
+    for t in df.itertuples(index=False, name=None):
+        yield dict_(zip_(cols, t))
+
+
+def _commit_batches(
+    col_ref,
+    records: Iterable[Tuple[str, Dict[str, Any]]],
+    size: int = FS_BATCH_SIZE,
+    workers: int = FS_WRITE_WORKERS,
+) -> None:
+    """(doc_id, payload) 목록을 size 개씩 batch 로 묶어 스레드풀에서 동시에 커밋."""
+    client = _get_firestore()
+    from firebase_admin import firestore
+    from google.api_core import exceptions, retry
+
+    commit_retry = retry.Retry(
+        predicate=retry.if_exception_type(exceptions.Aborted, exceptions.ServiceUnavailable)
+    )
+
+    def _commit(chunk: List[Tuple[str, Dict[str, Any]]]) -> None:
+        batch = client.batch()
+        for doc_id, payload in chunk:
+            batch.set(
+                col_ref.document(doc_id),
+                payload | {"created_at": firestore.SERVER_TIMESTAMP},
+            )
+        batch.commit(retry=commit_retry)
+
+    it = iter(records)
+    chunks = iter(lambda: list(islice(it, size)), [])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_commit, chunks))  # 실패한 커밋 예외를 그대로 올림
+
+
+@st.cache_resource
+def _compacted_sizes() -> Dict[str, int]:
+    """로컬 저장소 파일별 마지막 중복 정리 직후 크기 (처음 보면 그때 크기, rerun 사이에도 유지)."""
+    return {}
+
+
+def _append_lines(path: str, lines: List[str]) -> None:
+    """
+    새 줄만 파일 끝에 추가 (저장할 때마다 전체를 다시 쓰지 않음).
+    파일이 마지막 정리 때의 2배(최소 COMPACT_BYTES)를 넘으면 그때만 중복 제거 + 정렬.
+    """
+    sizes = _compacted_sizes()
+    if path not in sizes:
+        # 프로세스 시작 후 처음 보는 파일은 현재 크기를 기준으로 삼음 (재시작마다 전체 정리 방지)
+        sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+
+    with open(path, "a", encoding="utf-8", buffering=1 << 20) as f:
+        f.writelines(lines)
+
+    if os.path.getsize(path) <= max(COMPACT_BYTES, 2 * sizes[path]):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        merged = set(f.readlines())
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(sorted(merged))
+    sizes[path] = os.path.getsize(path)
 
 
 def save_cafe(df: pd.DataFrame) -> None:
     if _use_firestore():
         client = _get_firestore()
-        from firebase_admin import firestore
-
-        batch = client.batch()
-        col = client.collection(COL_CAFE)
-        for row in _to_records(df):
-            doc_id = f"{row['블로그ID']}_{row['전화번호']}"
-            payload = {
-                "blog_id": row["블로그ID"],
-                "phone": row["전화번호"],
-                "created_at": firestore.SERVER_TIMESTAMP,
-            }
-            batch.set(col.document(doc_id), payload)
-        batch.commit()
+        _commit_batches(
+            client.collection(COL_CAFE),
+            (
+                (
+                    f"{row['블로그ID']}_{row['전화번호']}",
+                    {"blog_id": row["블로그ID"], "phone": row["전화번호"]},
+                )
+                for row in _to_records(df)
+            ),
+        )
+        _fs_query.clear()
         return
 
-    new_lines = [f"{row['블로그ID']},{row['전화번호']}\n" for _, row in df.iterrows()]
-    existing = set()
-    if os.path.exists(STORE_CAFE):
-        with open(STORE_CAFE, "r", encoding="utf-8") as f:
-            existing = set(f.readlines())
-    merged = existing.union(new_lines)
-    with open(STORE_CAFE, "w", encoding="utf-8") as f:
-        f.writelines(sorted(list(merged)))
+    new_lines = [f"{bid},{phone}\n" for bid, phone in zip(df["블로그ID"], df["전화번호"])]
+    _append_lines(STORE_CAFE, new_lines)
 
 
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
 def _fs_query(collection: str, limit: int | None = None) -> List[Dict[str, Any]]:
-    """Ordered, limited fetch to avoid unbounded stream latency."""
+    """
+    created_at 최신순으로 limit 건까지 조회.
+    FS_PAGE_SIZE 단위 페이지를 start_after 커서로 이어서 받고, 페이지마다 retry/timeout 적용.
+    """
     client = _get_firestore()
-    query = client.collection(collection)
-    try:
-        query = query.order_by(
-            "created_at", direction=client._firestore.Query.DESCENDING  # type: ignore[attr-defined]
-        )
-    except Exception:
-        pass
+    from firebase_admin import firestore
+    from google.api_core import exceptions, retry
 
-    if limit:
-        query = query.limit(limit)
-
-    docs = query.stream()
+    page_retry = retry.Retry(
+        predicate=retry.if_exception_type(exceptions.ServiceUnavailable, exceptions.DeadlineExceeded)
+    )
+    base = client.collection(collection).order_by(
+        "created_at", direction=firestore.Query.DESCENDING
+    )
 
-    rows = [d.to_dict() for d in docs]
+    rows: List[Dict[str, Any]] = []
+    last = None
+    while not limit or len(rows) < limit:
+        size = min(FS_PAGE_SIZE, limit - len(rows)) if limit else FS_PAGE_SIZE
+        query = base.limit(size)
+        if last is not None:
+            query = query.start_after(last)
+        docs = list(query.stream(retry=page_retry, timeout=FS_READ_TIMEOUT))
+        rows.extend(d.to_dict() for d in docs)
+        if len(docs) < size:
+            break
+        last = docs[-1]
     return rows
 
 
@@ -252,13 +372,17 @@ def load_cafe(limit: int | None = None) -> pd.DataFrame:
 
     if not os.path.exists(STORE_CAFE):
         return pd.DataFrame(columns=["블로그ID", "전화번호"])
+    # append 저장이라 정리 전까지는 중복 줄이 있을 수 있음 → 서로 다른 줄로 limit 개 채움
     rows: List[List[str]] = []
+    seen = set()
     with open(STORE_CAFE, "r", encoding="utf-8") as f:
-        for idx, line in enumerate(f):
-            if idx >= limit:
+        for line in f:
+            if len(rows) >= limit:
                 break
-            parts = line.strip().split(",")
-            if len(parts) == 2:
+            line = line.strip()
+            parts = line.split(",")
+            if len(parts) == 2 and line not in seen:
+                seen.add(line)
                 rows.append(parts)
     return pd.DataFrame(rows, columns=["블로그ID", "전화번호"])
 
@@ -266,24 +390,11 @@ def load_cafe(limit: int | None = None) -> pd.DataFrame:
 def save_best(ids: List[str]) -> None:
     if _use_firestore():
         client = _get_firestore()
-        from firebase_admin import firestore
-
-        batch = client.batch()
-        col = client.collection(COL_BEST)
-        for bid in ids:
-            payload = {"blog_id": bid, "created_at": firestore.SERVER_TIMESTAMP}
-            batch.set(col.document(bid), payload)
-        batch.commit()
+        _commit_batches(client.collection(COL_BEST), ((bid, {"blog_id": bid}) for bid in ids))
+        _fs_query.clear()
         return
 
-    new_lines = [f"{bid}\n" for bid in ids]
-    existing = set()
-    if os.path.exists(STORE_BEST):
-        with open(STORE_BEST, "r", encoding="utf-8") as f:
-            existing = set(f.readlines())
-    merged = existing.union(new_lines)
-    with open(STORE_BEST, "w", encoding="utf-8") as f:
-        f.writelines(sorted(list(merged)))
+    _append_lines(STORE_BEST, [f"{bid}\n" for bid in ids])
 
 
 def load_best(limit: int | None = None) -> pd.DataFrame:
@@ -297,37 +408,49 @@ def load_best(limit: int | None = None) -> pd.DataFrame:
 
     if not os.path.exists(STORE_BEST):
         return pd.DataFrame(columns=["블로그ID"])
+    # append 저장이라 정리 전까지는 중복 줄이 있을 수 있음 → 서로 다른 ID로 limit 개 채움
     ids: List[str] = []
+    seen = set()
     with open(STORE_BEST, "r", encoding="utf-8") as f:
-        for idx, line in enumerate(f):
-            if idx >= limit:
+        for line in f:
+            if len(ids) >= limit:
                 break
-            if line.strip():
-                ids.append(line.strip())
+            bid = line.strip()
+            if bid and bid not in seen:
+                seen.add(bid)
+                ids.append(bid)
     return pd.DataFrame(ids, columns=["블로그ID"])
 
 
 def save_match(df: pd.DataFrame) -> None:
     if _use_firestore():
         client = _get_firestore()
-        from firebase_admin import firestore
-
-        batch = client.batch()
-        col = client.collection(COL_MATCH)
-        for row in _to_records(df):
-            bid = row["블로그ID"]
-            doc = col.document(bid)
-            payload = {
-                "blog_id": bid,
-                "phone": row.get("전화번호", ""),
-                "memo": row.get("메모", ""),
-                "created_at": firestore.SERVER_TIMESTAMP,
-            }
-            batch.set(doc, payload)
-        batch.commit()
+        _commit_batches(
+            client.collection(COL_MATCH),
+            (
+                (
+                    row["블로그ID"],
+                    {
+                        "blog_id": row["블로그ID"],
+                        "phone": row.get("전화번호", ""),
+                        "memo": row.get("메모", ""),
+                    },
+                )
+                for row in _to_records(df)
+            ),
+        )
+        _fs_query.clear()
         return
 
-    df.to_excel(MATCH_XLSX, index=False)
+    df.to_parquet(MATCH_PARQUET, engine="pyarrow", compression="zstd", index=False)
+
+
+def _migrate_match_xlsx() -> None:
+    if os.path.exists(MATCH_XLSX) and not os.path.exists(MATCH_PARQUET):
+        # 셀마다 타입 추론하면 숫자/문자 섞인 열에서 to_parquet 이 실패하므로 전부 문자열로
+        pd.read_excel(MATCH_XLSX, dtype=str).to_parquet(
+            MATCH_PARQUET, engine="pyarrow", compression="zstd", index=False
+        )
 
 
 def load_match(limit: int | None = None) -> pd.DataFrame:
@@ -348,9 +471,11 @@ def load_match(limit: int | None = None) -> pd.DataFrame:
             df["메모"] = ""
         return df
 
-    if not os.path.exists(MATCH_XLSX):
+    _migrate_match_xlsx()
+    if not os.path.exists(MATCH_PARQUET):
         return pd.DataFrame(columns=["블로그ID", "전화번호", "메모"])
-    df = load_excel(MATCH_XLSX)
+    p = MATCH_PARQUET
+    df = load_parquet(p, os.path.getmtime(p), os.path.getsize(p))
     df = df.head(limit)
     if "메모" not in df.columns:
         df["메모"] = ""
@@ -384,26 +509,37 @@ def count_match() -> int | None:
         cnt = _fs_count(COL_MATCH)
         if cnt is not None:
             return int(cnt)
-    if os.path.exists(MATCH_XLSX):
-        try:
-            return len(load_excel(MATCH_XLSX))
-        except Exception:
-            return None
+    try:
+        _migrate_match_xlsx()
+        if os.path.exists(MATCH_PARQUET):
+            import pyarrow.parquet as pq
+
+            return pq.ParquetFile(MATCH_PARQUET).metadata.num_rows  # 데이터 안 읽고 footer 만
+    except Exception:
+        return None
     return None
 
 
+def _delete_collection(col_ref) -> None:
+    """문서 ID만 받아와서(select([])) BulkWriter 로 한 번에 삭제."""
+    bw = _get_firestore().bulk_writer()
+    for d in col_ref.select([]).stream():
+        bw.delete(d.reference)
+    bw.close()  # 남은 삭제 flush 후 종료
+
+
 def clear_all():
     if _use_firestore():
         client = _get_firestore()
         for col_name in [COL_CAFE, COL_BEST, COL_MATCH]:
-            docs = client.collection(col_name).stream()
-            for d in docs:
-                d.reference.delete()
+            _delete_collection(client.collection(col_name))
+        _fs_query.clear()
         return
 
-    for f in [STORE_CAFE, STORE_BEST, MATCH_XLSX]:
+    for f in [STORE_CAFE, STORE_BEST, MATCH_PARQUET, MATCH_XLSX]:
         if os.path.exists(f):
             os.remove(f)
+    _compacted_sizes().clear()
 
 
 # ------------------------------------------------------------------
@@ -423,6 +559,9 @@ menu = st.sidebar.radio(
     ["파일 업로드", "최적리스트 비교", "누적 저장소", "매칭 결과 & 메모", "데이터 초기화"],
 )
 
+# 로컬 저장소는 append 후 주기적으로만 중복 정리하므로 줄 수에 중복이 섞여 있음
+TOTAL_LABEL = "총 건수" if _use_firestore() else "총 건수 (중복 포함)"
+
 if _use_firestore():
     st.sidebar.success(f"저장소: Firestore ({FIREBASE_PROJECT_ID})")
 else:
@@ -437,23 +576,14 @@ if menu == "파일 업로드":
     uploaded = st.file_uploader("엑셀 파일 업로드", type=["xlsx", "xls"], key="excel_upload")
 
     if uploaded:
-        df = load_excel(uploaded)
+        df = load_upload(uploaded)
         st.session_state["excel_df"] = df
         st.success("엑셀을 불러왔습니다 (세션 저장됨)")
         st.write(df.head())
 
     if st.session_state["excel_df"] is not None and st.button("전화번호 추출 & 누적 저장"):
-        extracted: List[List[str]] = []
         df = st.session_state["excel_df"]
-
-        for i in range(1, len(df)):
-            blog_id = str(df.iloc[i, 0]).strip()
-            text = f"{df.iloc[i, 1]} {df.iloc[i, 3]}" if df.shape[1] > 3 else str(df.iloc[i, 1])
-            phones = extract_phone_numbers(text)
-            for p in phones:
-                extracted.append([blog_id, p])
-
-        result = pd.DataFrame(extracted, columns=["블로그ID", "전화번호"]).drop_duplicates()
+        result = extract_phone_frame(df).drop_duplicates()
         save_cafe(result)
         st.success("카페 DB에 저장 완료")
         st.metric("추출 개수", len(result))
@@ -500,7 +630,7 @@ elif menu == "누적 저장소":
         st.subheader("📦 카페 누적 DB")
         cafe_total = count_cafe()
         if cafe_total is not None:
-            st.metric("총 건수", cafe_total)
+            st.metric(TOTAL_LABEL, cafe_total)
         if st.button("카페 데이터 불러오기", key="load_cafe_view"):
             with st.spinner("불러오는 중..."):
                 df_cafe = load_cafe(limit=DEFAULT_VIEW_LIMIT)
@@ -514,7 +644,7 @@ elif menu == "누적 저장소":
         st.subheader("📚 최적리스트 DB")
         best_total = count_best()
         if best_total is not None:
-            st.metric("총 건수", best_total)
+            st.metric(TOTAL_LABEL, best_total)
         if st.button("최적리스트 불러오기", key="load_best_view"):
             with st.spinner("불러오는 중..."):
                 df_best = load_best(limit=DEFAULT_VIEW_LIMIT)